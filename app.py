@@ -1,7 +1,7 @@
 import streamlit as st
 import pandas as pd
 from supabase import create_client
-from datetime import datetime, timezone
+from datetime import datetime, timedelta, timezone
 import time
 import io
 from openpyxl.styles import PatternFill, Font, Alignment
@@ -11,9 +11,17 @@ from postgrest.exceptions import APIError
 SUPABASE_URL = st.secrets["SUPABASE_URL"] if "SUPABASE_URL" in st.secrets else ""
 SUPABASE_KEY = st.secrets["SUPABASE_KEY"] if "SUPABASE_KEY" in st.secrets else ""
 DAFTAR_SALES = ["Agung", "Al Fath", "Reza", "Rico", "Sasa", "Mita", "Supervisor"]
+# DAFTAR_CABANG di secrets boleh array TOML (["Pusat", "Bekasi"]) atau string koma ("Pusat, Bekasi")
+_CABANG_SECRET = st.secrets["DAFTAR_CABANG"] if "DAFTAR_CABANG" in st.secrets else ["Pusat"]
+DAFTAR_CABANG = [str(c).strip() for c in (_CABANG_SECRET.split(",") if isinstance(_CABANG_SECRET, str) else _CABANG_SECRET) if str(c).strip()] or ["Pusat"]
 RESET_PIN = "123456" # PIN Reset
+SESSION_KEY_CABANG = "current_cabang"
 SESSION_KEY_CHECKER = "current_checker_name" 
 SESSION_KEY_SEARCH = "current_search_term"
+SESSION_KEY_FEED = "change_feed_filters"
+FEED_POLL_SECONDS = 5 # Interval polling change feed (detik)
+FEED_PAGE_SIZE = 500 # Harus di bawah batas max-rows PostgREST (default Supabase 1000)
+FEED_OVERLAP_SECONDS = 30 # Jendela overlap watermark: updated_at dicap oleh client sebelum commit, jadi bisa "telat" masuk
 # QUICK_BRANDS dan logika dinamis dihilangkan total.
 
 if not SUPABASE_URL:
@@ -36,11 +44,15 @@ def parse_supabase_timestamp(timestamp_str):
     except Exception as e:
         return datetime(1970, 1, 1, 0, 0, 0, tzinfo=timezone.utc)
 
+def as_utc(dt):
+    """Memastikan datetime punya timezone (naive dianggap UTC) agar aman dibandingkan"""
+    return dt.replace(tzinfo=timezone.utc) if dt.tzinfo is None else dt
+
 def convert_df_to_excel(df):
     """Mengubah DataFrame menjadi file Excel dengan Header Cantik, termasuk Keterangan"""
     output = io.BytesIO()
     with pd.ExcelWriter(output, engine='openpyxl') as writer:
-        cols = ['batch_id', 'sku', 'brand', 'nama_barang', 'owner_category', 'lokasi', 'jenis', 'system_qty', 'fisik_qty', 'keterangan', 'updated_by', 'updated_at']
+        cols = ['cabang', 'batch_id', 'sku', 'brand', 'nama_barang', 'owner_category', 'lokasi', 'jenis', 'system_qty', 'fisik_qty', 'keterangan', 'updated_by', 'updated_at']
         available_cols = [c for c in cols if c in df.columns]
         df_export = df[available_cols] if not df.empty else df
         
@@ -63,10 +75,14 @@ def convert_df_to_excel(df):
 
 # --- FUNGSI UTAMA OPERATOR MANAGEMENT ---
 
-def get_operator_list():
-    """Mengambil daftar operator aktif dari database."""
+def get_cabang():
+    """Cabang/toko yang sedang dipilih di sidebar. Semua query SO & operator di-scope dengan ini."""
+    return st.session_state.get(SESSION_KEY_CABANG, DAFTAR_CABANG[0])
+
+def get_operator_list(cabang):
+    """Mengambil daftar operator aktif cabang dari database."""
     try:
-        res = supabase.table("operator_list").select("nama").eq("is_active", True).order("nama").execute()
+        res = supabase.table("operator_list").select("nama").eq("cabang", cabang).eq("is_active", True).order("nama").execute()
         names = [item['nama'] for item in res.data]
         
         if "Supervisor" not in names:
@@ -75,36 +91,41 @@ def get_operator_list():
     except Exception as e:
         return ["DEFAULT_USER", "Supervisor"] 
 
-def add_operator(name):
-    """Menambahkan operator baru ke tabel operator_list."""
+def add_operator(name, cabang):
+    """Menambahkan operator baru ke tabel operator_list (per cabang)."""
     try:
-        supabase.table("operator_list").insert({"nama": name}).execute()
+        supabase.table("operator_list").insert({"nama": name, "cabang": cabang}).execute()
         return True, f"Operator '{name}' berhasil ditambahkan."
     except Exception as e:
         if "duplicate key value violates unique constraint" in str(e):
-             return False, f"Gagal: Operator '{name}' sudah ada."
+             return False, f"Gagal: Operator '{name}' sudah ada di cabang {cabang}."
         return False, str(e)
 
-def delete_operator(name):
-    """Menonaktifkan operator (soft delete)."""
+def delete_operator(name, cabang):
+    """Menonaktifkan operator cabang (soft delete)."""
     if name == "Supervisor":
         return False, "Tidak bisa menonaktifkan Supervisor."
     try:
-        supabase.table("operator_list").update({"is_active": False}).eq("nama", name).execute()
+        supabase.table("operator_list").update({"is_active": False}).eq("cabang", cabang).eq("nama", name).execute()
         return True, f"Operator '{name}' berhasil dinonaktifkan."
     except Exception as e:
         return False, str(e)
 
 # --- FUNGSI HELPER DATABASE SO ---
-def get_active_session_info():
+def get_active_session_info(cabang):
     try:
-        res = supabase.table("stock_opname").select("batch_id").eq("is_active", True).limit(1).execute()
+        res = supabase.table("stock_opname").select("batch_id").eq("cabang", cabang).eq("is_active", True).limit(1).execute()
         if res.data: return res.data[0]['batch_id']
         return "Belum Ada Sesi Aktif"
     except: return "-"
 
-def get_data(lokasi=None, jenis=None, owner=None, search_term=None, only_active=True, batch_id=None):
-    query = supabase.table("stock_opname").select("*")
+def get_active_session_token(cabang):
+    """Identitas sesi aktif = id terkecil baris aktif cabang. Berubah tiap sesi baru/reset walau nama sesinya sama."""
+    res = supabase.table("stock_opname").select("id").eq("cabang", cabang).eq("is_active", True).order("id").limit(1).execute()
+    return res.data[0]['id'] if res.data else None
+
+def get_data(cabang, lokasi=None, jenis=None, owner=None, search_term=None, only_active=True, batch_id=None):
+    query = supabase.table("stock_opname").select("*").eq("cabang", cabang)
     if only_active: query = query.eq("is_active", True)
     elif batch_id: query = query.eq("batch_id", batch_id)
     
@@ -119,20 +140,149 @@ def get_data(lokasi=None, jenis=None, owner=None, search_term=None, only_active=
     if 'keterangan' not in df.columns:
         df['keterangan'] = ""
 
-    if not df.empty and search_term:
-        df = df[df['nama_barang'].str.contains(search_term, case=False, na=False) | 
-                df['brand'].str.contains(search_term, case=False, na=False) |
-                df['sku'].str.contains(search_term, case=False, na=False)]
+    df = filter_search_term(df, search_term)
     
     st.session_state['data_loaded_time'] = start_time
     st.session_state['current_df'] = df.copy()
+    st.session_state.pop(SESSION_KEY_FEED, None) # watermark berganti, data feed lama tidak valid lagi
     
     return df
 
+def filter_search_term(df, search_term):
+    """Filter lokal berdasarkan Brand/Nama/SKU"""
+    if df.empty or not search_term:
+        return df
+    return df[df['nama_barang'].str.contains(search_term, case=False, na=False) | 
+              df['brand'].str.contains(search_term, case=False, na=False) |
+              df['sku'].str.contains(search_term, case=False, na=False)]
+
+# --- CHANGE FEED (Polling by Watermark) ---
+def fetch_changes_since(watermark, cabang, lokasi=None, jenis=None, owner=None, columns="*"):
+    """Mengambil baris sesi aktif cabang (sesuai filter) yang updated_at-nya lebih baru dari (watermark - overlap).
+    Di-page dengan cursor (updated_at, id) karena respons PostgREST dibatasi dan satu batch upload punya updated_at yang sama."""
+    since = watermark - timedelta(seconds=FEED_OVERLAP_SECONDS)
+    rows, cursor = [], None
+    while True:
+        query = supabase.table("stock_opname").select(columns).eq("cabang", cabang).eq("is_active", True).gt("updated_at", since.isoformat())
+        if lokasi: query = query.eq("lokasi", lokasi)
+        if jenis: query = query.eq("jenis", jenis)
+        if owner: query = query.eq("owner_category", owner)
+        if cursor:
+            query = query.or_(f'updated_at.gt."{cursor[0]}",and(updated_at.eq."{cursor[0]}",id.gt.{cursor[1]})')
+        page = query.order("updated_at").order("id").limit(FEED_PAGE_SIZE).execute().data
+        rows.extend(page)
+        if len(page) < FEED_PAGE_SIZE:
+            return rows
+        cursor = (page[-1]['updated_at'], page[-1]['id'])
+
+def filter_unseen_changes(changes, df):
+    """Buang baris overlap yang id + updated_at-nya sudah sama dengan data sesi (dedupe)"""
+    if df.empty or 'updated_at' not in df.columns:
+        return changes
+    seen = {item_id: as_utc(parse_supabase_timestamp(ts)) for item_id, ts in zip(df['id'], df['updated_at'])}
+    return [row for row in changes
+            if seen.get(row['id']) != as_utc(parse_supabase_timestamp(row.get('updated_at')))]
+
+def get_live_data(cabang, lokasi, jenis, owner, search_term=None):
+    """Full load hanya saat cabang/filter/sesi berganti. Selanjutnya data sesi di-refresh in-place lewat change feed."""
+    try:
+        session_token = get_active_session_token(cabang)
+    except Exception:
+        session_token = None
+        st.session_state.pop(SESSION_KEY_FEED, None) # identitas sesi tidak bisa dipastikan -> full load
+    filters = (cabang, session_token, lokasi, jenis, owner)
+    if st.session_state.get(SESSION_KEY_FEED) != filters or 'feed_df' not in st.session_state:
+        st.session_state['feed_df'] = get_data(cabang, lokasi, jenis, owner, only_active=True)
+        st.session_state[SESSION_KEY_FEED] = filters
+    else:
+        sync_changes()
+
+    df = filter_search_term(st.session_state['feed_df'], search_term)
+    st.session_state['current_df'] = df.copy()
+    return df
+
+def sync_changes():
+    """Menarik baris yang berubah sejak watermark lalu menimpanya ke data sesi (tanpa reload penuh)"""
+    df = st.session_state['feed_df']
+    cabang, _, lokasi, jenis, owner = st.session_state[SESSION_KEY_FEED]
+    watermark = as_utc(st.session_state.get('data_loaded_time', datetime(1970, 1, 1, 0, 0, 0, tzinfo=timezone.utc)))
+    try:
+        changes = fetch_changes_since(watermark, cabang, lokasi, jenis, owner)
+    except Exception:
+        return 0
+    st.session_state['data_loaded_time'] = max([watermark] + [as_utc(parse_supabase_timestamp(row.get('updated_at'))) for row in changes])
+    changes = filter_unseen_changes(changes, df)
+    if changes:
+        merge_feed_rows(changes)
+    return len(changes)
+
+def merge_feed_rows(rows):
+    """Menimpa baris yang berubah di posisinya (urutan dari DB tetap), baris baru ditambahkan di akhir"""
+    df = st.session_state['feed_df'].reset_index(drop=True)
+    _, _, lokasi, jenis, owner = st.session_state[SESSION_KEY_FEED]
+    posisi = {item_id: i for i, item_id in enumerate(df['id'])} if not df.empty else {}
+    baris_baru, keluar_filter = [], []
+
+    for row in rows:
+        # Baris yang keluar dari filter (mis. pindah lokasi) dibuang dari data sesi
+        if (lokasi and row.get('lokasi') != lokasi) or (jenis and row.get('jenis') != jenis) or (owner and row.get('owner_category') != owner):
+            keluar_filter.append(row['id'])
+            continue
+        if row['id'] in posisi:
+            for col, val in row.items():
+                df.at[posisi[row['id']], col] = val
+        else:
+            baris_baru.append(row)
+
+        # Reset state widget agar nilai baru dari DB yang tampil (bukan nilai lama di browser)
+        for key in (f"sn_check_{row['id']}", f"notes_sn_{row['id']}", f"qty_non_{row['id']}", f"notes_non_{row['id']}"):
+            st.session_state.pop(key, None)
+
+    if keluar_filter:
+        df = df[~df['id'].isin(keluar_filter)].reset_index(drop=True)
+    if baris_baru:
+        df = pd.concat([df, pd.DataFrame(baris_baru)], ignore_index=True) if not df.empty else pd.DataFrame(baris_baru)
+    if 'keterangan' not in df.columns:
+        df['keterangan'] = ""
+    st.session_state['feed_df'] = df
+
+@st.fragment(run_every=FEED_POLL_SECONDS)
+def change_feed_watcher():
+    """Polling ringan di background: hanya rerun halaman jika ada baris baru/berubah di filter yang sedang dibuka."""
+    watermark = st.session_state.get('data_loaded_time')
+    if watermark is None or SESSION_KEY_FEED not in st.session_state:
+        return
+    cabang, session_token, lokasi, jenis, owner = st.session_state[SESSION_KEY_FEED]
+    try:
+        # Sesi baru / reset (walau nama sesi sama) tidak terlihat dari updated_at, jadi cek identitas sesinya
+        sesi_berganti = get_active_session_token(cabang) != session_token
+        pending = [] if sesi_berganti else fetch_changes_since(as_utc(watermark), cabang, lokasi, jenis, owner, columns="id, updated_at")
+    except Exception:
+        return
+    if sesi_berganti or filter_unseen_changes(pending, st.session_state.get('feed_df', pd.DataFrame())):
+        st.rerun()
+
+def refresh_feed_row(id_barang):
+    """Menarik ulang satu baris (mis. setelah konflik) ke data sesi tanpa reload penuh"""
+    if 'feed_df' not in st.session_state or SESSION_KEY_FEED not in st.session_state:
+        return
+    cabang = st.session_state[SESSION_KEY_FEED][0]
+    try:
+        rows = supabase.table("stock_opname").select("*").eq("id", id_barang).eq("cabang", cabang).eq("is_active", True).limit(1).execute().data
+    except Exception:
+        return
+    if rows:
+        merge_feed_rows(rows)
+    else:
+        # Baris sudah diarsipkan/dihapus: buang dari data sesi, jangan dimunculkan lagi
+        df = st.session_state['feed_df']
+        if not df.empty:
+            st.session_state['feed_df'] = df[df['id'] != id_barang].reset_index(drop=True)
+
 def get_db_updated_at(id_barang):
-    """Fungsi helper untuk mengambil updated_at dari DB saat ini"""
+    """Fungsi helper untuk mengambil updated_at dari DB saat ini (hanya baris sesi aktif)"""
     try:
-        res = supabase.table("stock_opname").select("updated_at, updated_by").eq("id", id_barang).limit(1).execute()
+        res = supabase.table("stock_opname").select("updated_at, updated_by").eq("id", id_barang).eq("is_active", True).limit(1).execute()
         
         if res.data and len(res.data) > 0:
             data = res.data[0]
@@ -166,10 +316,17 @@ def handle_update(row, new_qty, is_sn, nama_user, loaded_time, keterangan=""):
     if is_qty_changed or is_notes_changed:
         
         db_updated_at_str, updated_by_db = get_db_updated_at(id_barang)
-        db_updated_at = parse_supabase_timestamp(db_updated_at_str)
+        if updated_by_db in ("SYSTEM", "SYSTEM_ERROR"):
+            st.error(f"⚠️ GAGAL SIMPAN: **{row['nama_barang']}** tidak ada lagi di sesi aktif (sesi diganti/di-reset) atau database tidak terjangkau. Data sesi dimuat ulang.")
+            st.session_state.pop(SESSION_KEY_FEED, None)
+            return 0, True
+        db_updated_at = as_utc(parse_supabase_timestamp(db_updated_at_str))
+        # Baseline konflik per baris: updated_at baris yang sedang tampil (di-refresh oleh change feed)
+        row_loaded_at = as_utc(parse_supabase_timestamp(original_row['updated_at'])) if pd.notna(original_row.get('updated_at')) else as_utc(loaded_time)
         
-        if db_updated_at > loaded_time:
-            st.error(f"⚠️ KONFLIK DATA: **{row['nama_barang']}**! Data diubah oleh **{updated_by_db}** pada {db_updated_at.astimezone(None).strftime('%H:%M:%S')}. Mohon **Muat Ulang Data**.")
+        if db_updated_at > row_loaded_at:
+            st.error(f"⚠️ KONFLIK DATA: **{row['nama_barang']}**! Data diubah oleh **{updated_by_db}** pada {db_updated_at.astimezone(None).strftime('%H:%M:%S')}. Data terbaru sudah ditampilkan, mohon cek lalu input ulang.")
+            refresh_feed_row(id_barang)
             return 0, True
 
         update_payload = {
@@ -180,7 +337,11 @@ def handle_update(row, new_qty, is_sn, nama_user, loaded_time, keterangan=""):
         }
 
         try:
-            supabase.table("stock_opname").update(update_payload).eq("id", id_barang).execute()
+            res = supabase.table("stock_opname").update(update_payload).eq("id", id_barang).eq("is_active", True).execute()
+            if not res.data:
+                st.error(f"⚠️ GAGAL SIMPAN: **{row['nama_barang']}** tidak ada lagi di sesi aktif. Data sesi dimuat ulang.")
+                st.session_state.pop(SESSION_KEY_FEED, None)
+                return 0, True
             updates_count += 1
         except APIError as api_e:
             st.error(f"❌ Gagal Simpan Item {row['nama_barang']}. Mohon Cek Database/SKU. Detail: {api_e}")
@@ -215,11 +376,11 @@ def fast_save_callback(item_id, is_sn, notes_key, widget_key):
     elif updates > 0:
         st.toast(f"✅ {row['nama_barang']} disimpan otomatis!", icon="💾")
         st.cache_data.clear()
-        st.session_state.pop('current_df', None)
+        # Tidak perlu reload penuh: baris ini akan ditarik oleh change feed pada run berikutnya
         st.rerun()
 
 # --- FUNGSI ADMIN: PROSES DATA (Templates, Insert, Merge, Delete) ---
-def process_and_insert(df, session_name):
+def process_and_insert(df, session_name, cabang):
     data_to_insert = []
     for _, row in df.iterrows():
         is_sn = pd.notna(row.get('Serial Number')) and str(row.get('Serial Number')).strip() != ''
@@ -239,15 +400,20 @@ def process_and_insert(df, session_name):
             "jenis": row.get('JENIS'),
             "system_qty": int(row.get('Quantity', 0)),
             "fisik_qty": 0, "updated_by": "-", "is_active": True, "batch_id": session_name,
+            "cabang": cabang,
             "keterangan": None
         }
         data_to_insert.append(item)
     batch_size = 500
     for i in range(0, len(data_to_insert), batch_size):
-        supabase.table("stock_opname").insert(data_to_insert[i:i+batch_size]).execute()
+        batch = data_to_insert[i:i+batch_size]
+        # Stempel updated_at per batch (jam yang sama dengan save) agar baris baru tertangkap change feed sesi yang terbuka
+        stamp = datetime.utcnow().isoformat()
+        for item in batch: item["updated_at"] = stamp
+        supabase.table("stock_opname").insert(batch).execute()
     return True, len(data_to_insert)
 
-def merge_offline_data(df):
+def merge_offline_data(df, cabang):
     try:
         success_count = 0
         my_bar = st.progress(0)
@@ -261,27 +427,27 @@ def merge_offline_data(df):
                     "fisik_qty": int(qty_to_update), "updated_by": "Offline Upload",
                     "updated_at": datetime.utcnow().isoformat(),
                     "keterangan": str(keterangan_offline) if pd.notna(keterangan_offline) and str(keterangan_offline).strip() else None
-                }).eq("sku", sku_excel).eq("is_active", True).execute()
+                }).eq("cabang", cabang).eq("sku", sku_excel).eq("is_active", True).execute()
                 success_count += 1
             my_bar.progress((i + 1) / total_rows)
         return True, success_count
     except Exception as e: return False, str(e)
     
-def delete_active_session():
+def delete_active_session(cabang):
     try:
-        supabase.table("stock_opname").delete().eq("is_active", True).execute()
+        supabase.table("stock_opname").delete().eq("cabang", cabang).eq("is_active", True).execute()
         return True, "Sesi aktif berhasil dihapus total."
     except Exception as e: return False, str(e)
 
-def start_new_session(df, session_name):
+def start_new_session(df, session_name, cabang):
     try:
-        supabase.table("stock_opname").update({"is_active": False}).eq("is_active", True).execute()
-        return process_and_insert(df, session_name)
+        supabase.table("stock_opname").update({"is_active": False}).eq("cabang", cabang).eq("is_active", True).execute()
+        return process_and_insert(df, session_name, cabang)
     except Exception as e: return False, str(e)
 
-def add_to_current_session(df, current_session_name):
+def add_to_current_session(df, current_session_name, cabang):
     try:
-        return process_and_insert(df, current_session_name)
+        return process_and_insert(df, current_session_name, cabang)
     except Exception as e: return False, str(e)
 
 def get_master_template_excel():
@@ -313,10 +479,11 @@ def get_template_excel():
 
 # --- HALAMAN SALES ---
 def page_sales():
-    session_name = get_active_session_info()
-    st.title(f"📱 SO: {session_name}")
+    cabang = get_cabang()
+    session_name = get_active_session_info(cabang)
+    st.title(f"📱 SO {cabang}: {session_name}")
     
-    DAFTAR_SALES_DB = get_operator_list() 
+    DAFTAR_SALES_DB = get_operator_list(cabang) 
 
     if SESSION_KEY_CHECKER not in st.session_state:
         st.session_state[SESSION_KEY_CHECKER] = "-- Silahkan Pilih Nama Petugas --"
@@ -375,9 +542,11 @@ def page_sales():
     if st.button("🔄 Muat Ulang Data"):
         st.cache_data.clear()
         st.session_state.pop('current_df', None)
+        st.session_state.pop('feed_df', None)
         st.rerun()
 
-    df = get_data(lokasi, jenis, owner_filter, search_term=st.session_state[SESSION_KEY_SEARCH], only_active=True)
+    df = get_live_data(cabang, lokasi, jenis, owner_filter, search_term=st.session_state[SESSION_KEY_SEARCH])
+    change_feed_watcher()
     loaded_time = st.session_state.get('data_loaded_time', datetime(1970, 1, 1, 0, 0, 0, tzinfo=timezone.utc))
     
     if df.empty:
@@ -500,12 +669,13 @@ def page_sales():
 # --- HALAMAN ADMIN ---
 def page_admin():
     st.title("🛡️ Admin Dashboard (v5.0)")
-    active_session = get_active_session_info()
+    cabang = get_cabang()
+    active_session = get_active_session_info(cabang)
     
     if active_session == "Belum Ada Sesi Aktif":
-        st.warning("⚠️ Belum ada sesi aktif. Silakan mulai sesi baru di bawah.")
+        st.warning(f"⚠️ Belum ada sesi aktif di cabang {cabang}. Silakan mulai sesi baru di bawah.")
     else:
-        st.info(f"📅 Sesi Aktif: **{active_session}**")
+        st.info(f"📅 Sesi Aktif {cabang}: **{active_session}**")
     
     # Tab 4 diubah menjadi Manajemen Operator dan Reset
     tab1, tab2, tab3, tab4 = st.tabs(["🚀 Master Data", "📥 Upload Offline", "🗄️ Laporan Akhir", "👥 Operator & Reset"])
@@ -529,7 +699,7 @@ def page_admin():
             if c1.button("🔥 MULAI SESI BARU", type="primary"):
                 with st.spinner("Mereset & Upload..."):
                     df = pd.read_excel(file_master)
-                    ok, msg = start_new_session(df, new_session_name)
+                    ok, msg = start_new_session(df, new_session_name, cabang)
                     if ok: st.success(f"Sesi '{new_session_name}' Dimulai! {msg} Data Toko Masuk."); time.sleep(2); st.rerun()
                     else: st.error(f"Gagal: {msg}")
 
@@ -547,7 +717,7 @@ def page_admin():
                     with st.spinner("Menambahkan Data..."):
                         df_cons = pd.read_excel(file_cons)
                         if 'OWNER' not in df_cons.columns: df_cons['OWNER'] = 'Konsinyasi'
-                        ok, msg = add_to_current_session(df_cons, active_session)
+                        ok, msg = add_to_current_session(df_cons, active_session, cabang)
                         if ok: st.success(f"Berhasil menambahkan {msg} Data Konsinyasi ke sesi '{active_session}'."); time.sleep(2); st.rerun()
                         else: st.error(f"Gagal: {msg}")
 
@@ -562,20 +732,20 @@ def page_admin():
                 df_off = pd.read_excel(file_offline)
                 if 'Hitungan Fisik' not in df_off.columns: st.error("Format salah! Wajib ada kolom 'Hitungan Fisik'.")
                 else:
-                    ok, count = merge_offline_data(df_off)
+                    ok, count = merge_offline_data(df_off, cabang)
                     if ok: st.success(f"Berhasil update {count} data."); time.sleep(2); st.rerun()
                     else: st.error(f"Gagal: {count}")
 
     with tab3:
         mode_view = st.radio("Pilih Data:", ["Sesi Aktif Sekarang", "Arsip / History Lama"], horizontal=True)
         df = pd.DataFrame()
-        if mode_view == "Sesi Aktif Sekarang": df = get_data(only_active=True)
+        if mode_view == "Sesi Aktif Sekarang": df = get_data(cabang, only_active=True)
         else:
             try:
-                res = supabase.table("stock_opname").select("batch_id").eq("is_active", False).execute()
+                res = supabase.table("stock_opname").select("batch_id").eq("cabang", cabang).eq("is_active", False).execute()
                 batches = sorted(list(set([x['batch_id'] for x in res.data])), reverse=True)
                 selected_batch = st.selectbox("Pilih Sesi Lama:", batches) if batches else None
-                if selected_batch: df = get_data(only_active=False, batch_id=selected_batch)
+                if selected_batch: df = get_data(cabang, only_active=False, batch_id=selected_batch)
             except: st.error("Gagal load history.")
 
         if not df.empty:
@@ -615,14 +785,14 @@ def page_admin():
             new_operator_name = st.text_input("Nama Operator Baru (Wajib Unik)", placeholder="Contoh: Budi Satria")
             submit_add = st.form_submit_button("➕ Tambah Operator")
             if submit_add and new_operator_name:
-                ok, msg = add_operator(new_operator_name.strip())
+                ok, msg = add_operator(new_operator_name.strip(), cabang)
                 if ok: st.success(msg); time.sleep(1); st.rerun()
                 else: st.error(msg)
 
         # --- Sub-section 2: List and Delete ---
         st.subheader("Daftar Operator Aktif")
         try:
-            operator_data = supabase.table("operator_list").select("nama, is_active").eq("is_active", True).order("nama").execute().data
+            operator_data = supabase.table("operator_list").select("nama, is_active").eq("cabang", cabang).eq("is_active", True).order("nama").execute().data
             operator_df = pd.DataFrame(operator_data)
         except Exception:
             operator_df = pd.DataFrame()
@@ -636,7 +806,7 @@ def page_admin():
                 operator_to_delete = st.selectbox("Pilih Operator untuk Dinonaktifkan", opsi_hapus)
                 
                 if st.button(f"❌ Nonaktifkan {operator_to_delete}", type="secondary"):
-                    ok, msg = delete_operator(operator_to_delete)
+                    ok, msg = delete_operator(operator_to_delete, cabang)
                     if ok: st.success(msg); time.sleep(1); st.rerun()
                     else: st.error(msg)
         else:
@@ -646,7 +816,7 @@ def page_admin():
         
         # --- Sub-section 3: Danger Zone (Hard Reset) ---
         st.header("⚠️ DANGER ZONE (Reset Data Sesi)")
-        st.error("Menghapus SELURUH data pada sesi aktif saat ini.")
+        st.error(f"Menghapus SELURUH data pada sesi aktif cabang {cabang} saat ini. Cabang lain tidak terpengaruh.")
         
         dz_col1, dz_col2 = st.columns([3, 1]) 
         
@@ -661,7 +831,7 @@ def page_admin():
                 if input_pin == RESET_PIN:
                     if confirm_reset:
                         with st.spinner("Menghapus Sesi Aktif..."):
-                            ok, msg = delete_active_session()
+                            ok, msg = delete_active_session(cabang)
                             if ok: st.success("Sesi berhasil di-reset!"); time.sleep(2); st.rerun()
                             else: st.error(f"Gagal: {msg}")
                     else:
@@ -673,7 +843,8 @@ def page_admin():
 def main():
     st.set_page_config(page_title="SO System v5.0", page_icon="📦", layout="wide")
     st.sidebar.title("SO Apps v5.0")
-    st.sidebar.success(f"Sesi: {get_active_session_info()}")
+    st.sidebar.selectbox("🏬 Cabang", DAFTAR_CABANG, key=SESSION_KEY_CABANG)
+    st.sidebar.success(f"Sesi: {get_active_session_info(get_cabang())}")
     menu = st.sidebar.radio("Navigasi", ["Sales Input", "Admin Panel"])
     if menu == "Sales Input": page_sales()
     elif menu == "Admin Panel":
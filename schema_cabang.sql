@@ -0,0 +1,51 @@
+-- Multi-cabang: partisi stock_opname & operator_list per cabang/toko.
+-- Jalankan sekali di SQL Editor Supabase. Data lama masuk ke cabang 'Pusat'.
+
+ALTER TABLE stock_opname ADD COLUMN IF NOT EXISTS cabang text NOT NULL DEFAULT 'Pusat';
+ALTER TABLE operator_list ADD COLUMN IF NOT EXISTS cabang text NOT NULL DEFAULT 'Pusat';
+
+-- Sesi aktif per cabang (get_data, get_active_session_info, delete/start sesi)
+CREATE INDEX IF NOT EXISTS idx_so_cabang_active
+    ON stock_opname (cabang, is_active, lokasi, jenis, owner_category);
+-- Identitas sesi aktif (id terkecil) untuk change feed
+CREATE INDEX IF NOT EXISTS idx_so_cabang_active_id
+    ON stock_opname (cabang, id) WHERE is_active;
+-- Change feed (polling watermark updated_at) per cabang
+CREATE INDEX IF NOT EXISTS idx_so_cabang_active_updated
+    ON stock_opname (cabang, updated_at) WHERE is_active;
+-- Arsip / history per cabang
+CREATE INDEX IF NOT EXISTS idx_so_cabang_batch
+    ON stock_opname (cabang, batch_id);
+-- Merge offline per SKU
+CREATE INDEX IF NOT EXISTS idx_so_cabang_sku
+    ON stock_opname (cabang, sku) WHERE is_active;
+
+-- Nama operator cukup unik di dalam satu cabang.
+-- Nama constraint/index UNIQUE (nama) yang lama bisa berbeda-beda, jadi dicari dari katalog lalu di-drop.
+-- (Jika nama adalah PRIMARY KEY, ganti dulu PK-nya secara manual; script ini tidak menyentuh PK.)
+DO $$
+DECLARE
+    r record;
+    attnum_nama int2 := (SELECT attnum FROM pg_attribute
+                         WHERE attrelid = 'operator_list'::regclass AND attname = 'nama');
+BEGIN
+    FOR r IN
+        SELECT conname FROM pg_constraint
+        WHERE conrelid = 'operator_list'::regclass AND contype = 'u' AND conkey = ARRAY[attnum_nama]
+    LOOP
+        EXECUTE format('ALTER TABLE operator_list DROP CONSTRAINT %I', r.conname);
+    END LOOP;
+
+    FOR r IN
+        SELECT ic.relname FROM pg_index i JOIN pg_class ic ON ic.oid = i.indexrelid
+        WHERE i.indrelid = 'operator_list'::regclass AND i.indisunique AND NOT i.indisprimary
+          AND i.indkey::int2[] = ARRAY[attnum_nama]
+    LOOP
+        EXECUTE format('DROP INDEX %I', r.relname);
+    END LOOP;
+END $$;
+
+CREATE UNIQUE INDEX IF NOT EXISTS operator_list_cabang_nama_key ON operator_list (cabang, nama);
+
+-- Cek: hasilnya harus hanya index (cabang, nama) (+ PK). Kalau masih ada UNIQUE (nama), drop manual.
+-- SELECT indexname, indexdef FROM pg_indexes WHERE tablename = 'operator_list';